@@ -0,0 +1,138 @@
+"""
+bakeoff_adaptive.py
+Adaptive (successive-elimination) bakeoff: stop spending on models that can't win.
+
+Turns run in rounds. After each round every contender's samples are scored and
+bootstrapped (bakeoff_stats); a model is pruned once the upper bound of its
+total can't reach the leader's lower bound. floor(reallocate × freed) of the
+samples freed by pruned models goes to the remaining contenders (leaders get the
+remainder). No model ever gets more than per_round_cap() samples per turn in a
+round, and plan_bakeoff.py prices every model at that cap. A move from cheap
+pruned models to pricier contenders therefore stays inside the planned dollars.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from run_prompts import call_model, call_model_samples, write_samples
+from bakeoff_scoring import score_text
+from bakeoff_stats import summarize_models
+
+
+def per_round_cap(n_models, samples_per_round, reallocate, max_n):
+    """
+    Most samples one model can get for a turn in one round. Pruning stops at two
+    contenders, so at most n_models − 2 shares are freed, and each survivor gets
+    at most half of floor(reallocate × freed), rounded up.
+    """
+    extra = math.floor(reallocate * samples_per_round * max(0, n_models - 2))
+    return min(max_n, samples_per_round + math.ceil(extra / 2))
+
+def worst_case_samples(n_models, rounds, samples_per_round, reallocate, max_n):
+    """Per-model, per-turn sample ceiling for a whole run (round 1 never reallocates)."""
+    cap = per_round_cap(n_models, samples_per_round, reallocate, max_n)
+    return min(max_n, samples_per_round) + (rounds - 1) * cap
+
+
+def _sample_turn(model, turn, prompt, k, offset, temperature, max_tokens, outroot):
+    """Draw k more samples for (model, turn), append them to disk, return (row, contents)."""
+    print(f"▶️  [{model}] {turn} +{k} ...")
+    if k > 1:
+        contents, dt, tokens = call_model_samples(prompt, model=model, n=k,
+                                                  temperature=temperature, max_tokens=max_tokens)
+    else:
+        content, dt, tokens = call_model(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+        contents = [content]
+    outdir = Path(outroot) / model.replace(":", "_")
+    write_samples(outdir, turn, contents, start=offset)
+    if offset == 0:
+        (outdir / f"{turn}.txt").write_text(contents[0])
+    row = {"model": model, "turn": turn, "latency_s": round(dt, 2), "tokens": tokens, "samples": len(contents)}
+    return row, contents
+
+
+def run_adaptive(prompts, models, rounds=4, samples_per_round=2, min_samples=3, max_n=16,
+                 reallocate=0.5, temperature=0.7, max_tokens=1000, concurrency=1,
+                 n_boot=10000, confidence=0.95, seed=0, outroot="outputs"):
+    """
+    Returns {"summary", "errors", "pruned", "rounds_run", "samples_used", "samples_full_grid"}.
+    pruned maps model -> {"round", "mean", "hi", "leader", "leader_lo"}.
+    """
+    scores = {m: {t: [] for t in prompts} for m in models}
+    alive, pruned, errors, summary = list(models), {}, {}, []
+    stats, rounds_run = {}, 0
+    cap = per_round_cap(len(models), samples_per_round, reallocate, max_n)
+    ceiling = worst_case_samples(len(models), rounds, samples_per_round, reallocate, max_n)
+
+    for rnd in range(1, rounds + 1):
+        # Round 1 always runs; after that a lone contender has nothing left to prove
+        if not alive or (rnd > 1 and len(alive) <= 1):
+            break
+        # Whole samples only: extra = floor(reallocate × freed), split evenly, remainder to leaders
+        freed = samples_per_round * (len(models) - len(alive) - len(errors))
+        extra = math.floor(reallocate * freed)
+        ranked = sorted(alive, key=lambda m: -stats[m]["mean"]) if stats else list(alive)
+        k = {m: min(cap, samples_per_round + extra // len(alive) + (i < extra % len(alive)))
+             for i, m in enumerate(ranked)}
+        # Never draw past the per-model ceiling the pre-flight plan priced
+        k = {m: min(n, ceiling - max(len(s) for s in scores[m].values())) for m, n in k.items()}
+        k = {m: n for m, n in k.items() if n > 0}
+        if not k:
+            break
+        ranked = [m for m in ranked if m in k]
+        print(f"\n=== ROUND {rnd}/{rounds}: {len(alive)} contender(s), "
+              f"{sum(k.values())} sample(s) per turn ({', '.join(f'{m}={k[m]}' for m in ranked)}) ===")
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = {
+                pool.submit(_sample_turn, m, t, p, k[m], len(scores[m][t]),
+                            temperature, max_tokens, outroot): (m, t)
+                for m in ranked for t, p in prompts.items()
+            }
+            for fut in as_completed(futures):
+                m, t = futures[fut]
+                try:
+                    row, contents = fut.result()
+                except Exception as e:
+                    errors.setdefault(m, str(e))
+                    print(f"❌ {m} {t} failed: {e}")
+                    continue
+                row["round"] = rnd
+                summary.append(row)
+                scores[m][t].extend(score_text(c)[4] for c in contents)
+        rounds_run = rnd
+        alive = [m for m in alive if m not in errors]
+        if len(alive) <= 1:
+            break
+
+        stats, _ = summarize_models({m: [scores[m][t] for t in prompts] for m in alive},
+                                    n_boot=n_boot, confidence=confidence, seed=seed + rnd)
+        leader = max(alive, key=lambda m: stats[m]["mean"])
+        for m in sorted(alive, key=lambda m: -stats[m]["mean"]):
+            st = stats[m]
+            print(f"{m:16} {st['mean']:5.2f}  [{st['lo']:5.2f}, {st['hi']:5.2f}]  n={st['n']}")
+
+        if min(len(s) for m in alive for s in scores[m].values()) < min_samples:
+            continue
+        for m in list(alive):
+            if m != leader and stats[m]["hi"] < stats[leader]["lo"]:
+                pruned[m] = {"round": rnd, "mean": stats[m]["mean"], "hi": stats[m]["hi"],
+                             "leader": leader, "leader_lo": stats[leader]["lo"]}
+                alive.remove(m)
+                print(f"✂️  pruned {m}: upper bound {stats[m]['hi']:.2f} < "
+                      f"{leader} lower bound {stats[leader]['lo']:.2f}")
+
+    used = sum(len(s) for per_turn in scores.values() for s in per_turn.values())
+    full_grid = rounds * samples_per_round * len(models) * len(prompts)
+    over = [m for m in models if any(len(s) > ceiling for s in scores[m].values())]
+    if over or used > full_grid:
+        raise RuntimeError(f"Adaptive run exceeded its plan: {used}/{full_grid} samples, "
+                           f"over the per-model ceiling of {ceiling}: {over or 'none'}")
+    return {
+        "summary": summary,
+        "errors": errors,
+        "pruned": pruned,
+        "rounds_run": rounds_run,
+        "samples_used": used,
+        "samples_full_grid": full_grid,
+    }
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+bakeoff_queue.py
+Shared work queue so several worker processes can split one bakeoff.
+
+The coordinator (run_models_bakeoff.py with bakeoff.mode: queue) enqueues one
+task per (model, turn, variant) into a SQLite file. Workers lease a task, call
+the model, and commit the result back into the same file:
+
+- Leases expire after lease_seconds, so a dead worker's task is picked up again
+- Commits are idempotent: the first result for a task wins, later ones are ignored
+- A task that errors max_attempts times is marked failed (its model fails)
+- Workers only lease tasks of the run_id they were started for
+
+Each worker brings its own API key and rate budget:
+
+    OPENAI_API_KEY=sk-... python bakeoff_queue.py worker --run-id RUN --worker-id w1 --rpm 60
+    python bakeoff_queue.py worker --run-id RUN --api-key-env TEAM_B_KEY --models gpt-4o gpt-4.1
+    python bakeoff_queue.py status
+
+Workers must run on the same host as the queue file. SQLite relies on file
+locks that NFS/SMB shares don't reliably provide, so don't share the file
+across hosts over a network filesystem.
+"""
+
+import os, json, time, socket, sqlite3, argparse
+from pathlib import Path
+from run_prompts import call_model, call_model_samples, write_samples, load_context
+
+DEFAULT_DB = "outputs/bakeoff_queue.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id            TEXT PRIMARY KEY,      -- run_id|model|turn|variant
+    run_id        TEXT NOT NULL,
+    model         TEXT NOT NULL,
+    turn          TEXT NOT NULL,
+    variant       TEXT NOT NULL,
+    prompt        TEXT NOT NULL,
+    samples       INTEGER NOT NULL,
+    temperature   REAL NOT NULL,
+    max_tokens    INTEGER NOT NULL,
+    priority      REAL NOT NULL DEFAULT 0,
+    status        TEXT NOT NULL DEFAULT 'pending',   -- pending | leased | done | failed
+    lease_owner   TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    result        TEXT,
+    error         TEXT,
+    updated       REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (run_id, status, priority);
+"""
+
+
+class TaskQueue:
+    def __init__(self, db_path=DEFAULT_DB, max_attempts=3):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # Rollback journal, not WAL: WAL's shared-memory index needs every process on one host
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    def _tx(self):
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can't lease the same row
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    # ---- coordinator side ----
+    def enqueue(self, run_id, tasks):
+        """
+        tasks: dicts with model, turn, prompt, samples, temperature, max_tokens[, variant, priority].
+        Re-enqueueing an existing run_id resumes it: done rows are kept, failed rows are reset
+        to pending with a fresh attempt budget. Returns the number of failed rows reset.
+        """
+        now = time.time()
+        self._tx()
+        try:
+            for t in tasks:
+                variant = t.get("variant", "base")
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO tasks (id, run_id, model, turn, variant, prompt, samples,"
+                    " temperature, max_tokens, priority, updated) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                    (f"{run_id}|{t['model']}|{t['turn']}|{variant}", run_id, t["model"], t["turn"],
+                     variant, t["prompt"], int(t["samples"]), float(t["temperature"]),
+                     int(t["max_tokens"]), float(t.get("priority", 0)), now))
+            reset = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, lease_owner = NULL,"
+                " lease_expires = NULL, updated = ? WHERE run_id = ? AND status = 'failed'",
+                (now, run_id)).rowcount
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return reset
+
+    def counts(self, run_id=None):
+        sql = "SELECT status, COUNT(*) AS n FROM tasks"
+        args = ()
+        if run_id:
+            sql += " WHERE run_id = ?"
+            args = (run_id,)
+        rows = self.conn.execute(sql + " GROUP BY status", args).fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def results(self, run_id):
+        return [dict(r) for r in self.conn.execute(
+            "SELECT * FROM tasks WHERE run_id = ? ORDER BY model, turn, variant", (run_id,))]
+
+    def wait(self, run_id, poll_s=5.0, timeout=None):
+        """Block until no task of run_id is pending or leased."""
+        t0, last = time.time(), None
+        while True:
+            self.reap_exhausted(run_id)
+            c = self.counts(run_id)
+            open_n = c.get("pending", 0) + c.get("leased", 0)
+            if c != last:
+                print(f"⏳ queue {run_id}: " + ", ".join(f"{k}={v}" for k, v in sorted(c.items())))
+                last = c
+            if open_n == 0:
+                return c
+            if timeout is not None and time.time() - t0 > timeout:
+                raise TimeoutError(f"Queue run {run_id} still has {open_n} open task(s)")
+            time.sleep(poll_s)
+
+    # ---- worker side ----
+    def lease(self, worker_id, run_id, lease_s=600, models=None):
+        """Claim the highest-priority pending (or lease-expired) task of run_id, or return None."""
+        now = time.time()
+        sql = ("SELECT * FROM tasks WHERE run_id = ? AND (status = 'pending'"
+               " OR (status = 'leased' AND lease_expires < ?)) AND attempts < ?")
+        args = [run_id, now, self.max_attempts]
+        if models:
+            sql += f" AND model IN ({','.join('?' * len(models))})"
+            args += list(models)
+        sql += " ORDER BY priority DESC, id LIMIT 1"
+        self._tx()
+        try:
+            row = self.conn.execute(sql, args).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker_id, now + lease_s, now, row["id"]))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return dict(row)
+
+    def complete(self, task_id, worker_id, result):
+        """Idempotent: only the first commit for a task is stored. Returns True if this one won."""
+        cur = self.conn.execute(
+            "UPDATE tasks SET status = 'done', result = ?, lease_owner = ?, error = NULL, updated = ?"
+            " WHERE id = ? AND status != 'done'",
+            (json.dumps(result), worker_id, time.time(), task_id))
+        return cur.rowcount == 1
+
+    def fail(self, task_id, worker_id, error):
+        """Release the lease; the task goes back to pending until max_attempts is reached."""
+        self.conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " lease_owner = NULL, lease_expires = NULL, error = ?, updated = ?"
+            " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (self.max_attempts, error, time.time(), task_id, worker_id))
+
+    def reap_exhausted(self, run_id):
+        """Mark run_id tasks whose last lease expired on their final attempt as failed."""
+        now = time.time()
+        self.conn.execute(
+            "UPDATE tasks SET status = 'failed', error = COALESCE(error, 'lease expired'), updated = ?"
+            " WHERE run_id = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, run_id, now, self.max_attempts))
+
+
+# ---- worker ----------------------------------------------------------------
+def execute_task(task):
+    if task["samples"] > 1:
+        contents, dt, tokens = call_model_samples(task["prompt"], model=task["model"], n=task["samples"],
+                                                  temperature=task["temperature"],
+                                                  max_tokens=task["max_tokens"])
+    else:
+        content, dt, tokens = call_model(task["prompt"], model=task["model"],
+                                         temperature=task["temperature"], max_tokens=task["max_tokens"])
+        contents = [content]
+    return {"contents": contents, "latency_s": round(dt, 2), "tokens": tokens}
+
+def run_worker(db_path=DEFAULT_DB, run_id=None, worker_id=None, lease_s=600, max_attempts=3,
+               models=None, rpm=None, poll_s=2.0, exit_when_idle=True, stop=None):
+    """
+    Pull run_id's tasks until that run is drained (or forever with exit_when_idle=False).
+    `stop` is an optional threading.Event the coordinator sets to end its local workers.
+    """
+    if not run_id:
+        raise ValueError("run_worker needs a run_id — workers never lease tasks from other runs")
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    q = TaskQueue(db_path, max_attempts=max_attempts)
+    min_gap = 60.0 / rpm if rpm else 0.0
+    last_call, done = 0.0, 0
+    print(f"👷 worker {worker_id} → {db_path} (run {run_id})")
+    while not (stop and stop.is_set()):
+        task = q.lease(worker_id, run_id, lease_s=lease_s, models=models)
+        if task is None:
+            q.reap_exhausted(run_id)
+            c = q.counts(run_id)
+            if exit_when_idle and c.get("pending", 0) + c.get("leased", 0) == 0:
+                break
+            time.sleep(poll_s)
+            continue
+        wait = last_call + min_gap - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        last_call = time.time()
+        print(f"▶️  [{worker_id}] {task['model']} {task['turn']} ({task['variant']}) ...")
+        try:
+            result = execute_task(task)
+        except Exception as e:
+            print(f"❌ [{worker_id}] {task['id']} failed: {e}")
+            q.fail(task["id"], worker_id, str(e))
+            continue
+        if not q.complete(task["id"], worker_id, result):
+            print(f"↩️  [{worker_id}] {task['id']} already committed by another worker")
+        done += 1
+    print(f"✅ worker {worker_id} idle — {done} task(s) run")
+    return done
+
+
+# ---- coordinator helpers -----------------------------------------------------
+def materialize(rows, outroot="outputs"):
+    """Write committed results to outputs/<model>/ like run_turn does; return summary rows."""
+    summary = []
+    for r in rows:
+        if r["status"] != "done":
+            continue
+        res = json.loads(r["result"])
+        outdir = Path(outroot) / r["model"].replace(":", "_")
+        outdir.mkdir(parents=True, exist_ok=True)
+        contents = res["contents"]
+        if r["samples"] > 1:
+            write_samples(outdir, r["turn"], contents)
+        (outdir / f"{r['turn']}.txt").write_text(contents[0] if contents else "")
+        row = {
+            "model": r["model"],
+            "turn": r["turn"],
+            "latency_s": res["latency_s"],
+            "tokens": res["tokens"],
+            "worker": r["lease_owner"],
+        }
+        if r["samples"] > 1:
+            row["samples"] = r["samples"]
+        summary.append(row)
+    return summary
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bakeoff work-queue worker / status")
+    ap.add_argument("command", choices=["worker", "status"])
+    ap.add_argument("--db", default=None, help="queue file (default: bakeoff.queue.db in config)")
+    ap.add_argument("--run-id", default=None, help="run to work on (printed by the coordinator)")
+    ap.add_argument("--worker-id", default=None)
+    ap.add_argument("--models", nargs="*", default=None, help="only lease tasks for these models")
+    ap.add_argument("--api-key-env", default=None, help="env var holding this worker's API key")
+    ap.add_argument("--rpm", type=float, default=None, help="this worker's request budget per minute")
+    ap.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    args = ap.parse_args()
+
+    qcfg = {}
+    if Path("config_session.yaml").exists():
+        qcfg = ((load_context("config_session.yaml").get("bakeoff") or {}).get("queue") or {})
+    db = args.db or qcfg.get("db", DEFAULT_DB)
+
+    if args.command == "status":
+        q = TaskQueue(db)
+        for run in q.conn.execute("SELECT DISTINCT run_id FROM tasks ORDER BY run_id"):
+            c = q.counts(run["run_id"])
+            print(f"{run['run_id']}: " + ", ".join(f"{k}={v}" for k, v in sorted(c.items())))
+    else:
+        if not args.run_id:
+            ap.error("worker needs --run-id (see `python bakeoff_queue.py status`)")
+        if args.api_key_env:
+            key = os.getenv(args.api_key_env, "").strip()
+            if not key:
+                raise EnvironmentError(f"❌ {args.api_key_env} is not set.")
+            os.environ["OPENAI_API_KEY"] = key
+        run_worker(db, run_id=args.run_id, worker_id=args.worker_id,
+                   lease_s=float(qcfg.get("lease_seconds", 600)),
+                   max_attempts=int(qcfg.get("max_attempts", 3)),
+                   models=args.models, rpm=args.rpm, exit_when_idle=not args.forever)
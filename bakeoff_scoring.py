@@ -0,0 +1,43 @@
+import re, json
+
+# ---- Rubric helpers (shared by run_models_bakeoff.py and its modes) ----
+TURNS = ["T5_tam", "T6_sam", "T7_som"]
+MAX_TURN_SCORE = 8
+MAX_SCORE = MAX_TURN_SCORE * len(TURNS)   # 24
+
+def looks_like_question(text):
+    no_urls = re.sub(r'https?://\\S+', '', text)
+    return bool(re.search(r'[A-Za-z0-9]\\?(?:\\s|$)', no_urls))
+
+def json_has_reasoning(text):
+    m = re.search(r'\\{.*\\}', text, flags=re.S)
+    if not m:
+        return False
+    try:
+        obj = json.loads(m.group(0))
+    except Exception:
+        return False
+    def walk(v):
+        if isinstance(v, dict):
+            if any(k.lower() == "reasoning" and isinstance(v[k], str) and len(v[k].strip()) > 8 for k in v):
+                return True
+            return any(walk(x) for x in v.values())
+        if isinstance(v, list):
+            return any(walk(x) for x in v)
+        return False
+    return walk(obj)
+
+def has_specific_citation(text):
+    return bool(re.search(r'https?://[^ \\)\\]]+/', text))
+
+def has_formula_or_units(text):
+    return bool(re.search(r'[×x\\*=]|\\bARPU\\b|\\bUSD\\b|\\bformula\\b', text))
+
+def score_text(text):
+    """Return [noq, reasoning, citation, math, total] for one response (0/2 per criterion)."""
+    s_noq  = 0 if looks_like_question(text) else 2
+    s_reas = 2 if ("Reasoning (text)" in text or json_has_reasoning(text)) else 0
+    s_cite = 2 if has_specific_citation(text) else 0
+    s_math = 2 if has_formula_or_units(text) else 0
+    total  = s_noq + s_reas + s_cite + s_math
+    return [s_noq, s_reas, s_cite, s_math, total]
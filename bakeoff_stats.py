@@ -0,0 +1,75 @@
+"""
+bakeoff_stats.py
+Bootstrap statistics for repeated-sampling bakeoffs.
+
+Each model has N scored samples per turn. Resampling is stratified by turn
+(samples are redrawn within each turn), and a model's bootstrap total is the
+sum of its per-turn resampled means — the same scale as the 0–24 scoreboard.
+All B resamples for a turn are drawn in one vectorized NumPy call.
+"""
+
+import numpy as np
+
+
+def bootstrap_totals(turn_scores, n_boot=10000, rng=None):
+    """
+    turn_scores: list of 1-D score arrays, one per turn (lengths may differ).
+    Returns an array of shape (n_boot,) with resampled totals.
+    """
+    rng = np.random.default_rng(rng)
+    totals = np.zeros(n_boot)
+    for scores in turn_scores:
+        scores = np.asarray(scores, dtype=float)
+        if scores.size == 0:
+            continue                         # missing turn scores 0
+        idx = rng.integers(0, scores.size, size=(n_boot, scores.size))
+        totals += scores[idx].mean(axis=1)
+    return totals
+
+
+def summarize_models(model_scores, n_boot=10000, confidence=0.95, seed=0):
+    """
+    model_scores: {model: [turn_scores, ...]} as accepted by bootstrap_totals.
+    Returns (stats, boots) where stats is {model: {mean, lo, hi, n}} and
+    boots is {model: bootstrap totals} for pairwise comparisons.
+    """
+    rng = np.random.default_rng(seed)
+    alpha = 1.0 - confidence
+    stats, boots = {}, {}
+    for model, turn_scores in model_scores.items():
+        b = bootstrap_totals(turn_scores, n_boot=n_boot, rng=rng)
+        lo, hi = np.quantile(b, [alpha / 2, 1 - alpha / 2])
+        stats[model] = {
+            "mean": float(sum(np.mean(s) for s in turn_scores if len(s))),
+            "lo": float(lo),
+            "hi": float(hi),
+            "n": int(sum(len(s) for s in turn_scores)),
+        }
+        boots[model] = b
+    return stats, boots
+
+
+def pairwise_comparisons(boots, confidence=0.95, order=None):
+    """
+    For every ordered pair (a, b) with a ranked above b, return
+    P(a beats b) over independent bootstrap draws (ties count ½) and whether
+    the CI of the difference a − b excludes zero. Pass the scoreboard's
+    `order` so both tables share one ranking (default: bootstrap means).
+    """
+    alpha = 1.0 - confidence
+    ranked = list(order) if order is not None else sorted(boots, key=lambda m: -boots[m].mean())
+    rows = []
+    for i, a in enumerate(ranked):
+        for b in ranked[i + 1:]:
+            diff = boots[a] - boots[b]
+            p_win = float(np.mean(diff > 0) + 0.5 * np.mean(diff == 0))
+            lo, hi = np.quantile(diff, [alpha / 2, 1 - alpha / 2])
+            rows.append({
+                "a": a,
+                "b": b,
+                "p_win": p_win,
+                "diff_lo": float(lo),
+                "diff_hi": float(hi),
+                "significant": bool(lo > 0 or hi < 0),
+            })
+    return rows
@@ -19,12 +19,17 @@ REQUIRED_FILES = [
     "prompts_pm.json",
     "run_prompts.py",
     "run_models_bakeoff.py",
+    "bakeoff_scoring.py",
+    "plan_bakeoff.py",
     "build_evals_dataset.py",
     "build_traces.py",
     "eval_labeler.py",
 ]
 OPTIONAL_FILES = [
     "export_traces_csv.py",
+    "bakeoff_stats.py",
+    "bakeoff_queue.py",
+    "bakeoff_adaptive.py",
     "notebook_setup_health_check.py",
     "TheProdBot_Evals_Demo.ipynb",
 ]
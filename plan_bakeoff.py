@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+plan_bakeoff.py
+Pre-flight planner for run_models_bakeoff.py — no API calls.
+
+- Counts prompt tokens locally per model (tiktoken if installed, else ~4 chars/token)
+- Estimates output length + latency per (model, turn) from past outputs/summary_*.json
+- Projects $ cost and wall-clock time under bakeoff.concurrency (queue mode:
+  queue.local_workers) and rate_limits
+- Orders tasks longest-first (LPT) to minimise makespan
+- Refuses runs whose projected cost exceeds bakeoff.budget_usd
+
+Run `python plan_bakeoff.py` for a dry run of the configured bakeoff.
+"""
+
+import json, glob, heapq, statistics
+from collections import defaultdict
+from pathlib import Path
+from run_prompts import load_context, SYSTEM_PROMPT
+from bakeoff_scoring import TURNS
+
+try:
+    import tiktoken
+except ImportError:           # optional: fall back to a character heuristic
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+MSG_OVERHEAD_TOKENS = 4       # per chat message (role + separators)
+REPLY_PRIMING_TOKENS = 3
+DEFAULT_TOKENS_PER_S = 40     # output throughput assumed when a model has no history
+REQUEST_OVERHEAD_S = 1.0
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+# ---- tokenization ----------------------------------------------------------
+def count_tokens(text, model):
+    if tiktoken is None:
+        return max(1, round(len(text) / CHARS_PER_TOKEN))
+    try:
+        enc = tiktoken.encoding_for_model(model)
+    except KeyError:
+        enc = tiktoken.get_encoding("o200k_base")
+    return len(enc.encode(text))
+
+def prompt_tokens(prompt, model):
+    """Input tokens for one call: system + user message plus chat framing."""
+    return (count_tokens(SYSTEM_PROMPT, model) + count_tokens(prompt, model)
+            + 2 * MSG_OVERHEAD_TOKENS + REPLY_PRIMING_TOKENS)
+
+
+# ---- history from past runs --------------------------------------------------
+def load_history(prompts, outroot="outputs"):
+    """
+    Returns {(model, turn): {"completion": [...], "latency": [...]}} from summary_*.json.
+    Completion tokens per sample = (total_tokens - prompt_tokens) / samples.
+    """
+    hist = defaultdict(lambda: {"completion": [], "latency": []})
+    for path in sorted(glob.glob(f"{outroot}/summary_*.json")):
+        try:
+            rows = json.loads(Path(path).read_text())
+        except Exception:
+            continue
+        for r in rows if isinstance(rows, list) else []:
+            model, turn = r.get("model"), r.get("turn")
+            if model is None or turn is None:
+                continue
+            h = hist[(model, turn)]
+            if r.get("latency_s") is not None:
+                h["latency"].append(float(r["latency_s"]))
+            if r.get("tokens") is not None and turn in prompts:
+                n = int(r.get("samples", 1)) or 1
+                out = (r["tokens"] - prompt_tokens(prompts[turn], model)) / n
+                h["completion"].append(max(1.0, out))
+    return hist
+
+def _median(xs):
+    return statistics.median(xs) if xs else None
+
+def _estimate(hist, model, turn, key):
+    """Median for (model, turn), else that model's median across turns, else None."""
+    exact = _median(hist.get((model, turn), {}).get(key, []))
+    if exact is not None:
+        return exact, "history"
+    pooled = [x for (m, _), h in hist.items() if m == model for x in h[key]]
+    if pooled:
+        return _median(pooled), "model history"
+    return None, "default"
+
+
+# ---- scheduling --------------------------------------------------------------
+def lpt_makespan(durations, workers):
+    """Longest-processing-time-first onto `workers` slots; returns the makespan."""
+    loads = [0.0] * max(1, workers)
+    heapq.heapify(loads)
+    for d in sorted(durations, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + d)
+    return max(loads)
+
+
+# ---- plan --------------------------------------------------------------------
+def plan_run(cfg, prompts, models, outroot="outputs", samples=None, calls=1):
+    """`samples`/`calls` override samples_per_turn (samples = total per task over `calls` requests)."""
+    bake = cfg.get("bakeoff", {}) or {}
+    if samples is None and bake.get("mode") == "adaptive":
+        # Price every model at its reallocation ceiling (freed samples may move to pricier models)
+        from bakeoff_adaptive import worst_case_samples
+        ad = bake.get("adaptive", {}) or {}
+        calls = int(ad.get("rounds", 4))
+        samples = worst_case_samples(len(models), calls, int(ad.get("samples_per_round", 2)),
+                                     float(ad.get("reallocate", 0.5)),
+                                     int(ad.get("max_samples_per_call", 16)))
+    samples = int(samples or bake.get("samples_per_turn", 1))
+    max_tokens = int(bake.get("max_tokens", 1000))
+    concurrency = int(bake.get("concurrency", 1))
+    workers_note = ""
+    if bake.get("mode") == "queue":
+        # Queue runs are drained by the coordinator's local workers (plus any remote ones)
+        local = int((bake.get("queue", {}) or {}).get("local_workers", concurrency))
+        concurrency = max(1, local)
+        workers_note = (f"{local} local queue worker(s); remote workers shorten this" if local
+                        else "remote workers only — assumes 1 worker")
+    pricing = cfg.get("pricing", {}) or {}
+    limits = cfg.get("rate_limits", {}) or {}
+    hist = load_history(prompts, outroot)
+
+    tasks = []
+    for model in models:
+        price = pricing.get(model, {}) or {}
+        for turn, prompt in prompts.items():
+            p_tok = prompt_tokens(prompt, model) * calls
+            out, src = _estimate(hist, model, turn, "completion")
+            out = min(out, max_tokens) if out is not None else max_tokens
+            lat, _ = _estimate(hist, model, turn, "latency")
+            if lat is None:
+                lat = REQUEST_OVERHEAD_S + out / DEFAULT_TOKENS_PER_S
+            lat *= calls
+            cost = (p_tok * price.get("input_per_1m", 0.0)
+                    + out * samples * price.get("output_per_1m", 0.0)) / 1e6
+            tasks.append({
+                "model": model,
+                "turn": turn,
+                "samples": samples,
+                "prompt_tokens": p_tok,
+                "completion_tokens": round(out * samples),
+                "est_source": src,
+                "est_seconds": round(lat, 2),
+                "est_cost_usd": round(cost, 5),
+                "priced": bool(price),
+            })
+
+    # Longest-first so the slowest calls start immediately and the tail stays short
+    tasks.sort(key=lambda t: -t["est_seconds"])
+
+    makespan = lpt_makespan([t["est_seconds"] for t in tasks], concurrency)
+    rate_floor = 0.0
+    for model in models:
+        lim = limits.get(model, limits.get("default", {})) or {}
+        mt = [t for t in tasks if t["model"] == model]
+        if lim.get("rpm"):
+            rate_floor = max(rate_floor, 60.0 * len(mt) * calls / lim["rpm"])
+        if lim.get("tpm"):
+            toks = sum(t["prompt_tokens"] + t["completion_tokens"] for t in mt)
+            rate_floor = max(rate_floor, 60.0 * toks / lim["tpm"])
+
+    return {
+        "tasks": tasks,
+        "concurrency": concurrency,
+        "workers_note": workers_note,
+        "samples": samples,
+        "max_tokens": max_tokens,
+        "prompt_tokens": sum(t["prompt_tokens"] for t in tasks),
+        "completion_tokens": sum(t["completion_tokens"] for t in tasks),
+        "cost_usd": round(sum(t["est_cost_usd"] for t in tasks), 4),
+        "unpriced_models": sorted({t["model"] for t in tasks if not t["priced"]}),
+        "makespan_s": round(makespan, 1),
+        "rate_limit_floor_s": round(rate_floor, 1),
+        "wall_clock_s": round(max(makespan, rate_floor), 1),
+        "budget_usd": bake.get("budget_usd"),
+    }
+
+def check_budget(plan):
+    cap = plan.get("budget_usd")
+    if cap is not None and plan["cost_usd"] > float(cap):
+        raise BudgetExceeded(
+            f"Projected cost ${plan['cost_usd']:.4f} exceeds budget_usd ${float(cap):.4f}")
+
+def print_plan(plan):
+    print("\n=== PRE-FLIGHT PLAN ===")
+    print(f"Tasks: {len(plan['tasks'])}  |  samples/turn: {plan['samples']}  |  "
+          f"max_tokens: {plan['max_tokens']}  |  concurrency: {plan['concurrency']}")
+    print(f"Tokens: ~{plan['prompt_tokens']:,} in / ~{plan['completion_tokens']:,} out"
+          f"{'' if tiktoken else '  (≈4 chars/token; pip install tiktoken for exact counts)'}")
+    print(f"Cost:   ~${plan['cost_usd']:.4f}"
+          + (f"  (budget ${float(plan['budget_usd']):.2f})" if plan.get("budget_usd") is not None else ""))
+    if plan["unpriced_models"]:
+        print(f"⚠️ No pricing for: {', '.join(plan['unpriced_models'])} (counted as $0)")
+    print(f"Time:   ~{plan['wall_clock_s']:.0f}s wall clock "
+          f"(LPT makespan {plan['makespan_s']:.0f}s, rate-limit floor {plan['rate_limit_floor_s']:.0f}s)")
+    if plan.get("workers_note"):
+        print(f"        ↳ {plan['workers_note']}")
+    print("\nOrder (longest first):")
+    for t in plan["tasks"]:
+        print(f"  {t['model']:16} {t['turn']:8} ~{t['est_seconds']:6.1f}s  "
+              f"~{t['completion_tokens']:>5} out tok  ${t['est_cost_usd']:.5f}  [{t['est_source']}]")
+
+
+if __name__ == "__main__":
+    import sys
+    cfg = load_context("config_session.yaml")
+    all_prompts = json.load(open("prompts_pm.json"))
+    subset = {k: v for k, v in all_prompts.items() if k in TURNS}
+    plan = plan_run(cfg, subset, cfg.get("models_to_test", []))
+    print_plan(plan)
+    try:
+        check_budget(plan)
+    except BudgetExceeded as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    print("\n✅ Within budget.")
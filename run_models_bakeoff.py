@@ -1,6 +1,9 @@
-import os, re, json, glob, traceback
+import os, sys, json, glob, traceback
 from collections import defaultdict
-from run_prompts import load_context, run_flow  # renamed engine script
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from run_prompts import load_context, run_turn, write_summary  # renamed engine script
+from bakeoff_scoring import TURNS, MAX_SCORE, score_text
+from plan_bakeoff import plan_run, print_plan, check_budget, BudgetExceeded
 
 # ---- 1️⃣ Load models dynamically from config ----
 cfg = load_context("config_session.yaml")
@@ -8,91 +11,215 @@ MODELS = cfg.get("models_to_test", [])
 if not MODELS:
     raise ValueError("No models found in config_session.yaml under 'models_to_test'")
 
+bake_cfg = cfg.get("bakeoff", {}) or {}
+MODE = bake_cfg.get("mode", "local")        # local | queue | adaptive
+SAMPLES = int(bake_cfg.get("samples_per_turn", 1))
+SAMPLED = SAMPLES > 1 or MODE == "adaptive"
+TEMPERATURE = float(bake_cfg.get("sample_temperature", 0.7)) if SAMPLED else 0.2
+MAX_TOKENS = int(bake_cfg.get("max_tokens", 1000))
+CONCURRENCY = max(1, int(bake_cfg.get("concurrency", 1)))
+
 print(f"\n=== Running bake-off for models: {', '.join(MODELS)} ===\n")
+if MODE == "adaptive":
+    print(f"✂️ Adaptive rounds: pruning models that can't catch the leader @ temperature {TEMPERATURE}\n")
+elif SAMPLES > 1:
+    print(f"🎲 Repeated sampling: {SAMPLES} samples per turn @ temperature {TEMPERATURE}\n")
 
 # ---- 2️⃣ Prompts subset: focus on T5–T7 only ----
 all_prompts = json.load(open("prompts_pm.json"))
-subset = {k: v for k, v in all_prompts.items() if k in ["T5_tam", "T6_sam", "T7_som"]}
+subset = {k: v for k, v in all_prompts.items() if k in TURNS}
 
-# ---- 3️⃣ Run each model independently ----
-ok_models, failed_models = [], []
-for model in MODELS:
-    try:
-        print(f"====== Running {model} ======")
-        run_flow(cfg, subset, [model])
-        ok_models.append(model)
-    except Exception as e:
-        failed_models.append((model, str(e)))
-        print(f"❌ {model} failed: {e}")
-        traceback.print_exc()
-
-# ---- 4️⃣ Scoring helpers ----
-def looks_like_question(text):
-    no_urls = re.sub(r'https?://\\S+', '', text)
-    return bool(re.search(r'[A-Za-z0-9]\\?(?:\\s|$)', no_urls))
-
-def json_has_reasoning(text):
-    m = re.search(r'\\{.*\\}', text, flags=re.S)
-    if not m:
-        return False
+# ---- 3️⃣ Pre-flight plan: tokens, cost, wall clock, budget cap ----
+plan = plan_run(cfg, subset, MODELS)
+print_plan(plan)
+try:
+    check_budget(plan)
+except BudgetExceeded as e:
+    print(f"\n❌ {e} — refusing to run. Raise bakeoff.budget_usd or trim models_to_test.")
+    sys.exit(1)
+if bake_cfg.get("dry_run"):
+    print("\n🧪 bakeoff.dry_run is set — stopping before any API calls.")
+    sys.exit(0)
+
+# ---- 4️⃣ Run planned tasks longest-first (a failing call fails its model) ----
+summary, errors, pruned = [], {}, {}
+if MODE == "adaptive":
+    from bakeoff_adaptive import run_adaptive
+    acfg = bake_cfg.get("adaptive", {}) or {}
+    adaptive = run_adaptive(subset, MODELS,
+                            rounds=int(acfg.get("rounds", 4)),
+                            samples_per_round=int(acfg.get("samples_per_round", 2)),
+                            min_samples=int(acfg.get("min_samples", 3)),
+                            max_n=int(acfg.get("max_samples_per_call", 16)),
+                            reallocate=float(acfg.get("reallocate", 0.5)),
+                            temperature=TEMPERATURE, max_tokens=MAX_TOKENS, concurrency=CONCURRENCY,
+                            n_boot=int(bake_cfg.get("bootstrap_resamples", 10000)),
+                            confidence=float(bake_cfg.get("confidence", 0.95)),
+                            seed=bake_cfg.get("seed", 0))
+    summary, errors, pruned = adaptive["summary"], adaptive["errors"], adaptive["pruned"]
+elif MODE == "queue":
+    # Coordinator: enqueue, let local and/or remote workers drain, then collect
+    import threading
+    from datetime import datetime
+    from bakeoff_queue import TaskQueue, run_worker, materialize
+    qcfg = bake_cfg.get("queue", {}) or {}
+    db = qcfg.get("db", "outputs/bakeoff_queue.sqlite")
+    run_id = qcfg.get("run_id") or datetime.now().strftime("%Y%m%d_%H%M%S")
+    queue = TaskQueue(db, max_attempts=int(qcfg.get("max_attempts", 3)))
+    reset = queue.enqueue(run_id, [
+        dict(t, prompt=subset[t["turn"]], temperature=TEMPERATURE, max_tokens=MAX_TOKENS,
+             priority=t["est_seconds"])
+        for t in plan["tasks"]
+    ])
+    print(f"\n📬 Enqueued run {run_id} → {db}  "
+          f"(more workers: python bakeoff_queue.py worker --run-id {run_id})")
+    if reset:
+        print(f"🔁 Resuming run {run_id}: {reset} failed task(s) reset for retry")
+    stop_workers = threading.Event()
+    workers = [threading.Thread(target=run_worker, daemon=True,
+                                kwargs=dict(db_path=db, run_id=run_id, worker_id=f"local-{i}",
+                                            stop=stop_workers,
+                                            lease_s=float(qcfg.get("lease_seconds", 600)),
+                                            max_attempts=int(qcfg.get("max_attempts", 3))))
+               for i in range(int(qcfg.get("local_workers", CONCURRENCY)))]
+    for w in workers:
+        w.start()
     try:
-        obj = json.loads(m.group(0))
-    except Exception:
-        return False
-    def walk(v):
-        if isinstance(v, dict):
-            if any(k.lower() == "reasoning" and isinstance(v[k], str) and len(v[k].strip()) > 8 for k in v):
-                return True
-            return any(walk(x) for x in v.values())
-        if isinstance(v, list):
-            return any(walk(x) for x in v)
-        return False
-    return walk(obj)
-
-def has_specific_citation(text):
-    return bool(re.search(r'https?://[^ \\)\\]]+/', text))
-
-def has_formula_or_units(text):
-    return bool(re.search(r'[×x\\*=]|\\bARPU\\b|\\bUSD\\b|\\bformula\\b', text))
+        queue.wait(run_id, timeout=qcfg.get("timeout_seconds"))
+        timed_out = False
+    except TimeoutError as e:
+        # Score what finished; unfinished tasks fail their models (resume with queue.run_id)
+        timed_out = True
+        print(f"⏰ {e} — scoring finished tasks; resume later with bakeoff.queue.run_id: {run_id}")
+    stop_workers.set()     # local workers finish their current call, then lease nothing new
+    rows = queue.results(run_id)
+    summary = materialize(rows)
+    for r in rows:
+        if r["status"] != "done":
+            errors.setdefault(r["model"], "timeout" if timed_out and r["status"] in ("pending", "leased")
+                              else r["error"] or r["status"])
+else:
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        futures = {
+            pool.submit(run_turn, t["model"], t["turn"], subset[t["turn"]], samples=SAMPLES,
+                        temperature=TEMPERATURE, max_tokens=MAX_TOKENS): t
+            for t in plan["tasks"]
+        }
+        for fut in as_completed(futures):
+            t = futures[fut]
+            try:
+                summary.append(fut.result())
+            except Exception as e:
+                errors.setdefault(t["model"], str(e))
+                print(f"❌ {t['model']} {t['turn']} failed: {e}")
+                traceback.print_exc()
+if summary:
+    write_summary(summary)
+
+ok_models = [m for m in MODELS if m not in errors]
+failed_models = [(m, errors[m]) for m in MODELS if m in errors]
+for m in ok_models:
+    print(f"✅  [{m}] complete")
 
 # ---- 5️⃣ Score files ----
 rows = []
+sample_scores = {}   # model -> [per-turn list of sample totals]
 for model in ok_models:
     model_dir = f"outputs/{model.replace(':', '_')}"
-    for turn in ["T5_tam", "T6_sam", "T7_som"]:
+    per_turn = []
+    for turn in TURNS:
         path = f"{model_dir}/{turn}.txt"
         if not os.path.exists(path):
             rows.append([model, turn, 0, 0, 0, 0, 0])
+            per_turn.append([0])
             continue
-        text = open(path).read()
-        s_noq  = 0 if looks_like_question(text) else 2
-        s_reas = 2 if ("Reasoning (text)" in text or json_has_reasoning(text)) else 0
-        s_cite = 2 if has_specific_citation(text) else 0
-        s_math = 2 if has_formula_or_units(text) else 0
-        total  = s_noq + s_reas + s_cite + s_math
-        rows.append([model, turn, s_noq, s_reas, s_cite, s_math, total])
-
-# ---- 6️⃣ Aggregate & print summary ----
+        rows.append([model, turn] + score_text(open(path).read()))
+        sample_paths = sorted(glob.glob(f"{model_dir}/samples/{turn}/s*.txt"))
+        per_turn.append([score_text(open(p).read())[4] for p in sample_paths] or [rows[-1][6]])
+    sample_scores[model] = per_turn
+
+# ---- 6️⃣ Repeated-sampling stats (bootstrap CIs + pairwise win probabilities) ----
+stats, pairs = {}, []
+if SAMPLED and sample_scores:
+    from bakeoff_stats import summarize_models, pairwise_comparisons
+    confidence = float(bake_cfg.get("confidence", 0.95))
+    stats, boots = summarize_models(sample_scores,
+                                    n_boot=int(bake_cfg.get("bootstrap_resamples", 10000)),
+                                    confidence=confidence,
+                                    seed=bake_cfg.get("seed", 0))
+    pairs = pairwise_comparisons(boots, confidence=confidence,
+                                 order=sorted(stats, key=lambda m: -stats[m]["mean"]))
+    pct = int(round(confidence * 100))
+    sample_label = "adaptive samples" if MODE == "adaptive" else f"{SAMPLES} samples/turn"
+
+def model_note(m):
+    if m in pruned:
+        return f"pruned (round {pruned[m]['round']})"
+    return "ok" if m in ok_models else "failed"
+
+# ---- 7️⃣ Aggregate & print summary (sample mean ranks when sampling, else the single sample) ----
 totals = defaultdict(int)
 for r in rows:
     totals[r[0]] += r[6]
 
-print("\n=== MODEL SCORES (max 24) ===")
+if stats:
+    print(f"\n=== MODEL SCORES: mean over {sample_label} (max {MAX_SCORE}, {pct}% bootstrap CI) ===")
+    for m, st in sorted(stats.items(), key=lambda x: -x[1]["mean"]):
+        flag = "" if m in ok_models else " (failed)"
+        print(f"{m:16} {st['mean']:5.2f}/{MAX_SCORE}  [{st['lo']:5.2f}, {st['hi']:5.2f}]  n={st['n']}{flag}")
+
+    print("\n=== PAIRWISE (higher-ranked vs lower-ranked) ===")
+    for p in pairs:
+        mark = "✅ significant" if p["significant"] else "≈ not significant"
+        print(f"{p['a']} > {p['b']}: P(win)={p['p_win']:.3f}  "
+              f"Δ CI [{p['diff_lo']:+.2f}, {p['diff_hi']:+.2f}]  {mark}")
+
+score_title = "FIRST SAMPLE ONLY — not a ranking" if stats else "MODEL SCORES"
+print(f"\n=== {score_title} (max {MAX_SCORE}) ===")
 for m, s in sorted(totals.items(), key=lambda x: -x[1]):
     flag = "" if m in ok_models else " (failed)"
-    print(f"{m:16} {s:>2}/24{flag}")
+    print(f"{m:16} {s:>2}/{MAX_SCORE}{flag}")
 
-print("\n=== DETAIL (per turn) ===")
+print("\n=== DETAIL (per turn{}) ===".format(", first sample" if stats else ""))
 for r in rows:
     print(r)
 
-# ---- 7️⃣ Save Markdown summary ----
+if MODE == "adaptive":
+    print(f"\n=== ADAPTIVE: {adaptive['rounds_run']} round(s), {adaptive['samples_used']} of "
+          f"{adaptive['samples_full_grid']} full-grid samples "
+          f"({adaptive['samples_used'] / max(1, adaptive['samples_full_grid']):.0%}) ===")
+    if not pruned:
+        print("No models pruned.")
+    for m, pr in sorted(pruned.items(), key=lambda x: x[1]["round"]):
+        print(f"✂️  {m}: pruned in round {pr['round']} (upper {pr['hi']:.2f} < "
+              f"{pr['leader']} lower {pr['leader_lo']:.2f})")
+
+# ---- 8️⃣ Save Markdown summary ----
 os.makedirs("outputs", exist_ok=True)
-md_lines = ["| Model | Score / 24 | Note |",
-            "|--------|-------------|------|"]
+md_lines = []
+if stats:
+    md_lines += [f"### Ranking: mean over {sample_label} ({pct}% bootstrap CI)", "",
+                 f"| Model | Mean / {MAX_SCORE} | CI low | CI high | Samples | Note |",
+                 "|--------|-------------|--------|---------|---------|------|"]
+    for m, st in sorted(stats.items(), key=lambda x: -x[1]["mean"]):
+        md_lines.append(f"| {m} | {st['mean']:.2f} | {st['lo']:.2f} | {st['hi']:.2f} | {st['n']} | {model_note(m)} |")
+    md_lines += ["", "| Higher | Lower | P(win) | Δ CI | Significant |",
+                 "|--------|-------|--------|------|-------------|"]
+    for p in pairs:
+        md_lines.append(f"| {p['a']} | {p['b']} | {p['p_win']:.3f} | "
+                        f"[{p['diff_lo']:+.2f}, {p['diff_hi']:+.2f}] | {'yes' if p['significant'] else 'no'} |")
+    md_lines += ["", "### First sample only (not a ranking)", ""]
+md_lines += [f"| Model | Score / {MAX_SCORE} | Note |",
+             "|--------|-------------|------|"]
 for m, s in sorted(totals.items(), key=lambda x: -x[1]):
-    note = "ok" if m in ok_models else "failed"
-    md_lines.append(f"| {m} | {s} | {note} |")
+    md_lines.append(f"| {m} | {s} | {model_note(m)} |")
+if MODE == "adaptive":
+    md_lines += ["", f"### Adaptive pruning ({adaptive['rounds_run']} rounds, "
+                     f"{adaptive['samples_used']}/{adaptive['samples_full_grid']} full-grid samples)", "",
+                 "| Model | Pruned in round | Upper bound | Leader | Leader lower bound |",
+                 "|--------|-----------------|-------------|--------|--------------------|"]
+    for m, pr in sorted(pruned.items(), key=lambda x: x[1]["round"]):
+        md_lines.append(f"| {m} | {pr['round']} | {pr['hi']:.2f} | {pr['leader']} | {pr['leader_lo']:.2f} |")
 md = "\n".join(md_lines)
 with open("outputs/bakeoff_summary.md", "w") as f:
     f.write(md)
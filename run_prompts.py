@@ -2,56 +2,98 @@ import os, json, yaml, time, openai
 from datetime import datetime
 from pathlib import Path
 
+SYSTEM_PROMPT = (
+    "You are TheProdBot (Research Edition), an autonomous agent. "
+    "NEVER ask questions. Use bounded assumptions and proceed. "
+    "Every answer must include either a visible 'Reasoning (text)' section "
+    "OR a 'reasoning' field in JSON."
+)
+
 def load_context(cfg_path="config_session.yaml"):
     with open(cfg_path) as f:
         return yaml.safe_load(f)
 
-def call_model(prompt, model="gpt-4o-mini", temperature=0.2, max_tokens=1000):
+def _chat(prompt, model, temperature, max_tokens, n=1):
     client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    system_msg = {
-        "role":"system",
-        "content":(
-            "You are TheProdBot (Research Edition), an autonomous agent. "
-            "NEVER ask questions. Use bounded assumptions and proceed. "
-            "Every answer must include either a visible 'Reasoning (text)' section "
-            "OR a 'reasoning' field in JSON."
-        )
-    }
+    system_msg = {"role":"system","content":SYSTEM_PROMPT}
     user_msg = {"role":"user","content":prompt}
     t0 = time.time()
     resp = client.chat.completions.create(
         model=model,
         messages=[system_msg, user_msg],
         temperature=temperature,
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
+        n=n
     )
     dt = time.time() - t0
-    content = resp.choices[0].message.content
     usage = getattr(resp, "usage", None)
     tokens = getattr(usage, "total_tokens", None) if usage else None
+    return resp, dt, tokens
+
+def call_model(prompt, model="gpt-4o-mini", temperature=0.2, max_tokens=1000):
+    resp, dt, tokens = _chat(prompt, model, temperature, max_tokens)
+    content = resp.choices[0].message.content
     return content, dt, tokens
 
-def run_flow(config, prompts, models, outroot="outputs"):
+def call_model_samples(prompt, model="gpt-4o-mini", n=5, temperature=0.7, max_tokens=1000):
+    """One multi-completion request (n=N) → N samples in a single round trip."""
+    resp, dt, tokens = _chat(prompt, model, temperature, max_tokens, n=n)
+    contents = [c.message.content or "" for c in sorted(resp.choices, key=lambda c: c.index)]
+    return contents, dt, tokens
+
+def write_samples(outdir, turn, contents, start=0):
+    """
+    Store samples under <outdir>/samples/<turn>/sNN.txt (kept out of the T*_*.txt trace glob).
+    start=0 replaces earlier samples; start>0 appends (multi-round runs).
+    """
+    sdir = Path(outdir) / "samples" / turn
+    sdir.mkdir(parents=True, exist_ok=True)
+    if start == 0:
+        for old in sdir.glob("s*.txt"):
+            old.unlink()
+    for i, text in enumerate(contents, start):
+        (sdir / f"s{i:02d}.txt").write_text(text)
+    return sdir
+
+def run_turn(model, turn, prompt, outroot="outputs", samples=1, temperature=0.2, max_tokens=1000):
+    """Run one (model, turn), write its output file(s), and return the summary row."""
+    outdir = Path(outroot) / model.replace(":", "_")
+    outdir.mkdir(parents=True, exist_ok=True)
+    print(f"▶️  [{model}] {turn} ...")
+    if samples > 1:
+        contents, dt, tokens = call_model_samples(prompt, model=model, n=samples,
+                                                  temperature=temperature, max_tokens=max_tokens)
+        write_samples(outdir, turn, contents)
+        content = contents[0]
+    else:
+        content, dt, tokens = call_model(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    (outdir / f"{turn}.txt").write_text(content)
+    row = {
+        "model": model,
+        "turn": turn,
+        "latency_s": round(dt, 2),
+        "tokens": tokens
+    }
+    if samples > 1:
+        row["samples"] = samples
+    return row
+
+def write_summary(summary, outroot="outputs"):
+    outroot_path = Path(outroot)
+    outroot_path.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    (outroot_path / f"summary_{stamp}.json").write_text(json.dumps(summary, indent=2))
+    print(f"📄 Wrote summary: {outroot_path}/summary_{stamp}.json")
+
+def run_flow(config, prompts, models, outroot="outputs", samples=1, temperature=0.2, max_tokens=1000):
     outroot_path = Path(outroot)
     outroot_path.mkdir(exist_ok=True)
 
     summary = []
     for model in models:
-        outdir = outroot_path / model.replace(":", "_")
-        outdir.mkdir(parents=True, exist_ok=True)
-
         for k, v in prompts.items():
-            print(f"▶️  [{model}] {k} ...")
-            content, dt, tokens = call_model(v, model=model)
-            (outdir / f"{k}.txt").write_text(content)
-            summary.append({
-                "model": model,
-                "turn": k,
-                "latency_s": round(dt, 2),
-                "tokens": tokens
-            })
-        print(f"✅  [{model}] complete → {outdir}")
+            summary.append(run_turn(model, k, v, outroot=outroot, samples=samples,
+                                    temperature=temperature, max_tokens=max_tokens))
+        print(f"✅  [{model}] complete → {outroot_path / model.replace(':', '_')}")
 
-    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    (outroot_path / f"summary_{stamp}.json").write_text(json.dumps(summary, indent=2))
-    print(f"📄 Wrote summary: {outroot_path}/summary_{stamp}.json")
+    write_summary(summary, outroot)